@@ -62,6 +62,8 @@ If customer not interested at all, call end_call.
 - Be authentic and natural
 """
 
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
 
 def _ensure_only_yes_no_instruction(text: str) -> str:
     t = (text or "").strip()
@@ -155,28 +157,31 @@ FUNCTIONS = [
 ]
 
 
-def decide_next_turn_llm(
+def build_chat_kwargs(
     lead: Optional[Lead],
     history: List[Dict[str, str]],
     last_user_utterance: str
-) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+) -> Dict[str, Any]:
     """
-    Use OpenAI API to decide the next conversational turn.
-    
+    Build the chat.completions.create() arguments for one conversational turn.
+
+    Shared by decide_next_turn_llm and offline callers (e.g. Batch API jobs)
+    so every path sends exactly the same prompt.
+
     Args:
         lead: Lead object with name, company, role, etc.
-        history: List of conversation turns [{"role": "assistant", "content": "..."}, {"role": "user", "content": "..."}]
+        history: Conversation turns (OpenAI or legacy {"user", "agent"} format)
         last_user_utterance: What the user just said
-    
+
     Returns:
-        Tuple of (agent_reply, action, action_payload)
-        - agent_reply: What the agent says next
-        - action: "offer_slots", "book_meeting", "end_call", or None
-        - action_payload: Additional data for the action
+        Keyword arguments for client.chat.completions.create()
     """
     
-    # Build messages for OpenAI
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    # Build messages for OpenAI.
+    # The prefix (system prompt, lead context, then history verbatim) must stay
+    # byte-identical from turn to turn so OpenAI prompt caching only prefills
+    # the new utterance: never trim, summarize or reorder history here.
+    messages = [dict(_SYSTEM_MESSAGE)]
     
     # Add context about the lead if available
     if lead:
@@ -216,17 +221,44 @@ def decide_next_turn_llm(
         "role": "user",
         "content": last_user_utterance
     })
+
+    return {
+        "model": config.OPENAI_MODEL,
+        "messages": messages,
+        "functions": FUNCTIONS,
+        "function_call": "auto",
+        "temperature": 0.7,
+        "max_tokens": 300,
+    }
+
+
+def decide_next_turn_llm(
+    lead: Optional[Lead],
+    history: List[Dict[str, str]],
+    last_user_utterance: str
+) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Use OpenAI API to decide the next conversational turn.
+
+    Args:
+        lead: Lead object with name, company, role, etc.
+        history: List of conversation turns [{"role": "assistant", "content": "..."}, {"role": "user", "content": "..."}]
+        last_user_utterance: What the user just said
+
+    Returns:
+        Tuple of (agent_reply, action, action_payload)
+        - agent_reply: What the agent says next
+        - action: "offer_slots", "book_meeting", "end_call", or None
+        - action_payload: Additional data for the action
+    """
     
+    # Build the request outside the try: a malformed history should raise, not
+    # be reported as an OpenAI error and turned into the apology reply.
+    kwargs = build_chat_kwargs(lead, history, last_user_utterance)
+
     try:
         # Call OpenAI API with function calling
-        response = client.chat.completions.create(
-            model=config.OPENAI_MODEL,
-            messages=messages,
-            functions=FUNCTIONS,
-            function_call="auto",
-            temperature=0.7,
-            max_tokens=300,
-        )
+        response = client.chat.completions.create(**kwargs)
         
         message = response.choices[0].message
         
@@ -239,7 +239,7 @@ async def twilio_voice(request: Request):
             call_sid,
             "twiml_voice_generated",
             {
-                "twiml": twiml,
+                "twiml": twiml.decode("utf-8"),
                 "lead_id": lead_id,
             },
         )
@@ -7,12 +7,16 @@ Handles:
 - Unicode normalization and control character removal
 """
 
+import functools
 import re
 import unicodedata
 import xml.sax.saxutils as saxutils
 from app.config import config
 from app.language.caller_he import get_caller_text
 
+# Same mapping as saxutils.escape(), usable via a single str.translate() call.
+_XML_TBL = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
 
 def _say_attrs() -> str:
     language = (config.CALLER_LANGUAGE or "he-IL").strip()
@@ -35,9 +39,13 @@ def _record_timeout_seconds() -> int:
     return timeout_s
 
 
+@functools.lru_cache(maxsize=256)
 def sanitize_say_text(text: str, fallback: str | None = None) -> str:
     """
     Sanitize text for Twilio <Say> tags.
+
+    Results are memoized: the fixed caller prompts from caller_he are
+    sanitized once per process instead of on every webhook.
     
     - Normalizes Unicode (NFKC)
     - Removes control characters (keeps basic whitespace)
@@ -54,7 +62,14 @@ def sanitize_say_text(text: str, fallback: str | None = None) -> str:
     """
     if not text:
         text = fallback or get_caller_text("fallback_short")
-    
+
+    # Fast path: the common prompt is already NFKC with no control chars or
+    # whitespace runs, so normalization/collapsing would be a no-op.
+    if text.isprintable() and "  " not in text and unicodedata.is_normalized("NFKC", text):
+        t = text.strip()
+        if t:
+            return t.translate(_XML_TBL)
+
     # Normalize Unicode (NFKC = compatibility decomposition + canonical composition)
     t = unicodedata.normalize("NFKC", text)
     
@@ -71,7 +86,74 @@ def sanitize_say_text(text: str, fallback: str | None = None) -> str:
     return saxutils.escape(t)
 
 
-def build_voice_twiml(greeting_hebrew: str, call_sid: str, lead_id: int) -> str:
+def _record_max_length() -> int:
+    max_len = int(getattr(config, "RECORD_MAX_LENGTH_SECONDS", 10) or 10)
+    if max_len <= 0:
+        max_len = 10
+    return max_len
+
+
+def _recording_action_url(call_sid: str, lead_id: int, turn: int) -> bytes:
+    url = f"{config.BASE_URL}/twilio/process-recording?call_sid={call_sid}&lead_id={lead_id}&turn={turn}"
+    return saxutils.escape(url).encode("utf-8")
+
+
+# TwiML templates are ASCII bytes; dynamic parts are inserted already UTF-8
+# encoded so the response body is built once, without an intermediate str.
+_SAY_RECORD_TMPL = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b"<Response>\n"
+    b"    <Say %b>%b</Say>\n"
+    b'    <Record playBeep="false" maxLength="%d" timeout="%d" action="%b" method="POST" />\n'
+    b"</Response>"
+)
+
+_SAY_HANGUP_TMPL = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b"<Response>\n"
+    b"    <Say %b>%b</Say>\n"
+    b"    <Hangup/>\n"
+    b"</Response>"
+)
+
+_OFFER_SLOTS_TMPL = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b"<Response>\n"
+    b"    <Say %b>%b</Say>\n"
+    b"    <Say %b>%b</Say>\n"
+    b'    <Record playBeep="false" maxLength="%d" timeout="%d" action="%b" method="POST" />\n'
+    b"</Response>"
+)
+
+_MEETING_CONFIRMED_TMPL = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b"<Response>\n"
+    b"    <Say %b>%b</Say>\n"
+    b'    <Pause length="1"/>\n'
+    b"    <Say %b>%b</Say>\n"
+    b"    <Hangup/>\n"
+    b"</Response>"
+)
+
+
+def _say_record_twiml(text_hebrew: str, call_sid: str, lead_id: int, turn: int) -> bytes:
+    return _SAY_RECORD_TMPL % (
+        _say_attrs().encode("utf-8"),
+        sanitize_say_text(text_hebrew).encode("utf-8"),
+        _record_max_length(),
+        _record_timeout_seconds(),
+        _recording_action_url(call_sid, lead_id, turn),
+    )
+
+
+def _say_hangup_twiml(text_hebrew: str) -> bytes:
+    return _SAY_HANGUP_TMPL % (
+        _say_attrs().encode("utf-8"),
+        sanitize_say_text(text_hebrew).encode("utf-8"),
+    )
+
+
+def build_voice_twiml(greeting_hebrew: str, call_sid: str, lead_id: int) -> bytes:
     """
     Build initial voice call TwiML with proper escaping.
     
@@ -81,28 +163,13 @@ def build_voice_twiml(greeting_hebrew: str, call_sid: str, lead_id: int) -> str:
         lead_id: Lead identifier
     
     Returns:
-        Complete TwiML XML string
+        Complete TwiML XML document (UTF-8 bytes)
     """
     # Default Hebrew input method: record (no beep), then transcribe.
-    greeting_escaped = sanitize_say_text(greeting_hebrew)
+    return _say_record_twiml(greeting_hebrew, call_sid, lead_id, 0)
 
-    action_url = f"{config.BASE_URL}/twilio/process-recording?call_sid={call_sid}&lead_id={lead_id}&turn=0"
-    action_url_escaped = saxutils.escape(action_url)
 
-    say_attrs = _say_attrs()
-    max_len = int(getattr(config, "RECORD_MAX_LENGTH_SECONDS", 10) or 10)
-    if max_len <= 0:
-        max_len = 10
-    timeout_s = _record_timeout_seconds()
-
-    return f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
-<Response>
-    <Say {say_attrs}>{greeting_escaped}</Say>
-    <Record playBeep=\"false\" maxLength=\"{max_len}\" timeout=\"{timeout_s}\" action=\"{action_url_escaped}\" method=\"POST\" />
-</Response>"""
-
-
-def build_error_twiml(error_message_hebrew: str) -> str:
+def build_error_twiml(error_message_hebrew: str) -> bytes:
     """
     Build error TwiML.
     
@@ -110,20 +177,12 @@ def build_error_twiml(error_message_hebrew: str) -> str:
         error_message_hebrew: Hebrew error message
     
     Returns:
-        TwiML XML string
+        TwiML XML document (UTF-8 bytes)
     """
-    msg_escaped = sanitize_say_text(error_message_hebrew)
+    return _say_hangup_twiml(error_message_hebrew)
 
-    say_attrs = _say_attrs()
-    
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say {say_attrs}>{msg_escaped}</Say>
-    <Hangup/>
-</Response>"""
 
-
-def build_hangup_twiml(final_message_hebrew: str) -> str:
+def build_hangup_twiml(final_message_hebrew: str) -> bytes:
     """
     Build TwiML that says a message and hangs up.
     
@@ -131,40 +190,17 @@ def build_hangup_twiml(final_message_hebrew: str) -> str:
         final_message_hebrew: Hebrew message before hanging up
     
     Returns:
-        TwiML XML string
+        TwiML XML document (UTF-8 bytes)
     """
-    msg_escaped = sanitize_say_text(final_message_hebrew)
-
-    say_attrs = _say_attrs()
-    
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say {say_attrs}>{msg_escaped}</Say>
-    <Hangup/>
-</Response>"""
+    return _say_hangup_twiml(final_message_hebrew)
 
 
-def build_record_fallback_twiml(prompt_hebrew: str, call_sid: str, lead_id: int, turn: int) -> str:
+def build_record_fallback_twiml(prompt_hebrew: str, call_sid: str, lead_id: int, turn: int) -> bytes:
     """Ask caller to repeat and record audio."""
-    prompt_escaped = sanitize_say_text(prompt_hebrew)
-
-    action_url = f"{config.BASE_URL}/twilio/process-recording?call_sid={call_sid}&lead_id={lead_id}&turn={turn}"
-    action_url_escaped = saxutils.escape(action_url)
-
-    say_attrs = _say_attrs()
-    max_len = int(getattr(config, "RECORD_MAX_LENGTH_SECONDS", 10) or 10)
-    if max_len <= 0:
-        max_len = 10
-    timeout_s = _record_timeout_seconds()
-
-    return f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
-<Response>
-    <Say {say_attrs}>{prompt_escaped}</Say>
-    <Record playBeep=\"false\" maxLength=\"{max_len}\" timeout=\"{timeout_s}\" action=\"{action_url_escaped}\" method=\"POST\" />
-</Response>"""
+    return _say_record_twiml(prompt_hebrew, call_sid, lead_id, turn)
 
 
-def build_continue_twiml(agent_reply_hebrew: str, call_sid: str, lead_id: int, turn: int) -> str:
+def build_continue_twiml(agent_reply_hebrew: str, call_sid: str, lead_id: int, turn: int) -> bytes:
     """
     Build TwiML to continue conversation with recording.
     
@@ -175,27 +211,12 @@ def build_continue_twiml(agent_reply_hebrew: str, call_sid: str, lead_id: int, t
         turn: Current turn number
     
     Returns:
-        TwiML XML string
+        TwiML XML document (UTF-8 bytes)
     """
-    reply_escaped = sanitize_say_text(agent_reply_hebrew)
-
-    next_url = f"{config.BASE_URL}/twilio/process-recording?call_sid={call_sid}&lead_id={lead_id}&turn={turn+1}"
-    next_url_escaped = saxutils.escape(next_url)
-
-    say_attrs = _say_attrs()
-    max_len = int(getattr(config, "RECORD_MAX_LENGTH_SECONDS", 10) or 10)
-    if max_len <= 0:
-        max_len = 10
-    timeout_s = _record_timeout_seconds()
+    return _say_record_twiml(agent_reply_hebrew, call_sid, lead_id, turn + 1)
 
-    return f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
-<Response>
-    <Say {say_attrs}>{reply_escaped}</Say>
-    <Record playBeep=\"false\" maxLength=\"{max_len}\" timeout=\"{timeout_s}\" action=\"{next_url_escaped}\" method=\"POST\" />
-</Response>"""
 
-
-def build_offer_slots_twiml(slots_message_hebrew: str, call_sid: str, lead_id: int, turn: int) -> str:
+def build_offer_slots_twiml(slots_message_hebrew: str, call_sid: str, lead_id: int, turn: int) -> bytes:
     """
     Build TwiML to offer meeting slots.
     
@@ -206,29 +227,21 @@ def build_offer_slots_twiml(slots_message_hebrew: str, call_sid: str, lead_id: i
         turn: Current turn number
     
     Returns:
-        TwiML XML string
+        TwiML XML document (UTF-8 bytes)
     """
-    slots_escaped = sanitize_say_text(slots_message_hebrew)
-    ask_time = sanitize_say_text(get_caller_text("ask_time"))
-
-    next_url = f"{config.BASE_URL}/twilio/process-recording?call_sid={call_sid}&lead_id={lead_id}&turn={turn+1}"
-    next_url_escaped = saxutils.escape(next_url)
-
-    say_attrs = _say_attrs()
-    max_len = int(getattr(config, "RECORD_MAX_LENGTH_SECONDS", 10) or 10)
-    if max_len <= 0:
-        max_len = 10
-    timeout_s = _record_timeout_seconds()
-
-    return f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
-<Response>
-    <Say {say_attrs}>{slots_escaped}</Say>
-    <Say {say_attrs}>{ask_time}</Say>
-    <Record playBeep=\"false\" maxLength=\"{max_len}\" timeout=\"{timeout_s}\" action=\"{next_url_escaped}\" method=\"POST\" />
-</Response>"""
-
-
-def build_meeting_confirmed_twiml(confirmation_message_hebrew: str) -> str:
+    say_attrs = _say_attrs().encode("utf-8")
+    return _OFFER_SLOTS_TMPL % (
+        say_attrs,
+        sanitize_say_text(slots_message_hebrew).encode("utf-8"),
+        say_attrs,
+        sanitize_say_text(get_caller_text("ask_time")).encode("utf-8"),
+        _record_max_length(),
+        _record_timeout_seconds(),
+        _recording_action_url(call_sid, lead_id, turn + 1),
+    )
+
+
+def build_meeting_confirmed_twiml(confirmation_message_hebrew: str) -> bytes:
     """
     Build TwiML for meeting confirmation.
     
@@ -236,17 +249,12 @@ def build_meeting_confirmed_twiml(confirmation_message_hebrew: str) -> str:
         confirmation_message_hebrew: Hebrew confirmation message
     
     Returns:
-        TwiML XML string
+        TwiML XML document (UTF-8 bytes)
     """
-    msg_escaped = sanitize_say_text(confirmation_message_hebrew)
-    follow_up = sanitize_say_text(get_caller_text("meeting_confirmed"))
-
-    say_attrs = _say_attrs()
-    
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say {say_attrs}>{msg_escaped}</Say>
-    <Pause length="1"/>
-    <Say {say_attrs}>{follow_up}</Say>
-    <Hangup/>
-</Response>"""
+    say_attrs = _say_attrs().encode("utf-8")
+    return _MEETING_CONFIRMED_TMPL % (
+        say_attrs,
+        sanitize_say_text(confirmation_message_hebrew).encode("utf-8"),
+        say_attrs,
+        sanitize_say_text(get_caller_text("meeting_confirmed")).encode("utf-8"),
+    )
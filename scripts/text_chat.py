@@ -3,12 +3,24 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import importlib.util
 import json
 import sys
-from typing import Any
+import threading
 
 import httpx
 
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]"); it is
+# only negotiated over https, so plain local servers keep using HTTP/1.1.
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Keep the connection open across user think-time (httpx drops idle
+# connections after 5s by default, forcing a new handshake every turn).
+_LIMITS = httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 def _print_action(action: str | None, payload: dict | None) -> None:
     if not action:
@@ -20,23 +32,68 @@ def _print_action(action: str | None, payload: dict | None) -> None:
         print(f"(action: {action})")
 
 
-def main(argv: list[str] | None = None) -> int:
-    parser = argparse.ArgumentParser(description="Interactive text-only chat with Agent Messiah via /agent/turn")
-    parser.add_argument("--base-url", default="http://localhost:8000", help="API base URL (default: http://localhost:8000)")
-    parser.add_argument("--lead-id", type=int, default=1, help="Lead id to use (default: 1)")
-    parser.add_argument("--timeout", type=float, default=45.0, help="HTTP timeout seconds (default: 45)")
-    args = parser.parse_args(argv)
+async def _read_input(prompt: str) -> str:
+    """Read a line without blocking the event loop.
+
+    Uses a daemon thread rather than the default executor so Ctrl+C can exit
+    while input() is still waiting.
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[str] = loop.create_future()
+
+    def _resolve(result: str | None, error: BaseException | None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result or "")
+
+    def _worker() -> None:
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(_resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(_resolve, line, None)
+
+    threading.Thread(target=_worker, daemon=True).start()
+    return await future
+
 
+def _encode_turn(role: str, content: str) -> str:
+    return json.dumps({"role": role, "content": content}, ensure_ascii=False)
+
+
+def _encode_request(lead_id: int, user_text: str, history_json: list[str]) -> bytes:
+    """Build the /agent/turn body from already-encoded history turns.
+
+    Each turn is JSON-encoded once when it is appended, so a long chat does not
+    re-serialize its whole history on every request.
+    """
+    return (
+        f'{{"lead_id":{json.dumps(lead_id)},'
+        f'"user_utterance":{json.dumps(user_text, ensure_ascii=False)},'
+        f'"history":[{",".join(history_json)}]}}'
+    ).encode("utf-8")
+
+
+async def _chat(args: argparse.Namespace) -> None:
     base_url = args.base_url.rstrip("/")
-    history: list[dict[str, Any]] = []
+    history_json: list[str] = []
 
     print("Text chat started. Type /exit to quit.")
     print("Tip: The agent is configured to respond in English.")
 
-    with httpx.Client(timeout=args.timeout) as client:
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=args.timeout,
+        http2=_HTTP2_AVAILABLE,
+        limits=_LIMITS,
+    ) as client:
         while True:
             try:
-                user_text = input("you> ").strip()
+                user_text = (await _read_input("you> ")).strip()
             except (EOFError, KeyboardInterrupt):
                 print()
                 break
@@ -46,14 +103,10 @@ def main(argv: list[str] | None = None) -> int:
             if user_text.lower() in {"/exit", "/quit", "exit", "quit"}:
                 break
 
-            req = {
-                "lead_id": args.lead_id,
-                "user_utterance": user_text,
-                "history": history,
-            }
+            body = _encode_request(args.lead_id, user_text, history_json)
 
             try:
-                resp = client.post(f"{base_url}/agent/turn", json=req)
+                resp = await client.post("/agent/turn", content=body, headers=_JSON_HEADERS)
                 resp.raise_for_status()
                 data = resp.json()
             except httpx.HTTPStatusError as e:
@@ -75,12 +128,27 @@ def main(argv: list[str] | None = None) -> int:
 
             _print_action(action, action_payload if isinstance(action_payload, dict) else None)
 
-            history.append({"role": "user", "content": user_text})
-            history.append({"role": "assistant", "content": agent_reply})
+            # Append-only: resending earlier turns unchanged keeps the prompt
+            # prefix stable so the server-side LLM prompt cache stays warm.
+            history_json.append(_encode_turn("user", user_text))
+            history_json.append(_encode_turn("assistant", agent_reply))
 
             if action == "end_call":
                 break
 
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Interactive text-only chat with Agent Messiah via /agent/turn")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API base URL (default: http://localhost:8000)")
+    parser.add_argument("--lead-id", type=int, default=1, help="Lead id to use (default: 1)")
+    parser.add_argument("--timeout", type=float, default=45.0, help="HTTP timeout seconds (default: 45)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_chat(args))
+    except KeyboardInterrupt:
+        print()
+
     return 0
 
 
@@ -1,108 +1,268 @@
+import copy
+import re
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
 import pytest
 
+from app import calendar_store, leads_store
+from app import redis_client as redis_client_module
+from app import llm_agent as llm_agent_module
+from app.config import Config, config as app_config
+from app.language import audio_transcriber as audio_transcriber_module
+from app.language import translator as translator_module
+from app.language.caller_he import get_caller_text
 
-@pytest.fixture(autouse=True)
-def _safe_test_config(monkeypatch, request):
-    """Force deterministic, offline-safe config for tests.
 
-    The repo loads .env on import; these overrides prevent real network calls
-    (OpenAI/Twilio) and reduce test flakiness.
-    """
-    from app.config import config, Config
+# Pristine in-memory stores (sample leads, no meetings), captured at import and
+# restored before every test so tests never see each other's leads/meetings.
+_PRISTINE_LEADS = copy.deepcopy(leads_store._leads_db)
+_PRISTINE_NEXT_LEAD_ID = leads_store._next_lead_id
+_PRISTINE_MEETINGS = copy.deepcopy(calendar_store._meetings_db)
+_PRISTINE_NEXT_MEETING_ID = calendar_store._next_meeting_id
+
 
+# Offline-safe config values applied to both the `Config` class and the shared
+# `config` instance for every test.
+_SAFE_CONFIG = {
     # LLM-only mode: provide a dummy OpenAI key so endpoints that require it are enabled,
     # but monkeypatch all networked functions (LLM + translation) to stay offline.
-    monkeypatch.setattr(Config, "OPENAI_API_KEY", "test", raising=False)
-    monkeypatch.setattr(Config, "ENABLE_TRANSLATION", True, raising=False)
-
+    "OPENAI_API_KEY": "test",
+    "ENABLE_TRANSLATION": True,
     # Disable Twilio credentials so outbound endpoints follow the "not configured" path
     # unless a test explicitly overrides.
-    monkeypatch.setattr(Config, "TWILIO_ACCOUNT_SID", "", raising=False)
-    monkeypatch.setattr(Config, "TWILIO_AUTH_TOKEN", "", raising=False)
-    monkeypatch.setattr(Config, "TWILIO_CALLER_ID", "", raising=False)
-
+    "TWILIO_ACCOUNT_SID": "",
+    "TWILIO_AUTH_TOKEN": "",
+    "TWILIO_CALLER_ID": "",
     # Keep debug endpoints accessible in tests unless a test opts out.
-    monkeypatch.setattr(Config, "API_KEY", "", raising=False)
-
+    "API_KEY": "",
     # Keep debug events disabled by default (tests that need it will enable).
-    monkeypatch.setattr(Config, "DEBUG_CALL_EVENTS", False, raising=False)
-
+    "DEBUG_CALL_EVENTS": False,
     # Avoid transcript spam in test output.
-    monkeypatch.setattr(Config, "LOG_CALL_TRANSCRIPT", False, raising=False)
-
-    # Keep the instance in sync for any code that reads instance attributes directly.
-    monkeypatch.setattr(config, "OPENAI_API_KEY", "test", raising=False)
-    monkeypatch.setattr(config, "ENABLE_TRANSLATION", True, raising=False)
-    monkeypatch.setattr(config, "TWILIO_ACCOUNT_SID", "", raising=False)
-    monkeypatch.setattr(config, "TWILIO_AUTH_TOKEN", "", raising=False)
-    monkeypatch.setattr(config, "TWILIO_CALLER_ID", "", raising=False)
-    monkeypatch.setattr(config, "API_KEY", "", raising=False)
-    monkeypatch.setattr(config, "DEBUG_CALL_EVENTS", False, raising=False)
-    monkeypatch.setattr(config, "LOG_CALL_TRANSCRIPT", False, raising=False)
+    "LOG_CALL_TRANSCRIPT": False,
+}
+
+
+# Entry points that reach the network (recording download + Whisper, OpenAI
+# translation clients). Blocked for every test so a missing mock fails fast
+# instead of waiting on an HTTP timeout; tests override them for the positive path.
+# Outbound Twilio calls need no entry here: _SAFE_CONFIG blanks the Twilio
+# credentials, so the routes never build a twilio.rest.Client.
+_NETWORK_ENTRYPOINTS = (
+    (audio_transcriber_module, "transcribe_twilio_recording_url_to_hebrew"),
+    (audio_transcriber_module, "_get_openai_client"),
+    (translator_module, "_get_openai_client"),
+)
+
+
+def _network_blocker(target):
+    def _blocked(*args, **kwargs):
+        raise RuntimeError(f"network in test: {target} was not mocked")
+
+    return _blocked
+
+
+def _fake_get_initial_greeting(lead):
+    name = None
+    try:
+        name = (lead.name.split()[0] if lead and getattr(lead, "name", None) else None)
+    except Exception:
+        name = None
+    who = name or "there"
+    return (
+        f"Hi {who}! I'm the agent from Habari's Sales Company. We help companies increase sales with AI agents. "
+        "Is this a good time to talk? Please answer ONLY yes or no."
+    )
+
+
+# One anchored pass that tries the intents in priority order (who > no > yes);
+# each branch is a lookahead so the first alternative that matches anywhere in
+# the text wins, exactly like the chain of `in` checks it replaces.
+_FAKE_INTENT_RE = re.compile(
+    r"(?:(?=.*?who are you)(?P<who>)"
+    r"|(?=.*?not interested|(?:no|nope)\Z)(?P<no>)"
+    r"|(?=.*?(?:yes|sounds interesting))(?P<yes>))",
+    re.S,
+)
+
+_FAKE_REPLIES = {
+    "who": (
+        "I'm Messiah, an AI agent from Habari's Sales Company. We help sales teams increase sales with AI agents.",
+        None,
+        None,
+    ),
+    "no": (
+        "No problem. If you change your mind, feel free to reach out. Goodbye.",
+        "end_call",
+        {"reason": "Not interested"},
+    ),
+    "yes": (
+        "Great. I can offer a quick intro call. Does tomorrow 10:00 or Thursday 14:00 work?",
+        "offer_slots",
+        {
+            "slots": [
+                {"start": "2030-01-01T10:00:00", "display_text": "tomorrow 10:00", "duration_minutes": 30},
+                {"start": "2030-01-03T14:00:00", "display_text": "Thursday 14:00", "duration_minutes": 30},
+            ]
+        },
+    ),
+}
+
+_FAKE_DEFAULT_REPLY = ("Thanks. How do you handle inbound leads today?", None, None)
+
+
+def _fake_decide_next_turn_llm(*, lead, history, last_user_utterance):
+    text = (last_user_utterance or "").strip().lower()
+    m = _FAKE_INTENT_RE.match(text)
+    # Copy so callers that store/mutate the payload never leak state between tests.
+    return copy.deepcopy(_FAKE_REPLIES[m.lastgroup]) if m else _FAKE_DEFAULT_REPLY
+
+
+def _fake_translate_en_to_he(_text):
+    return get_caller_text("permission_ask")
+
+
+def _fake_translate_he_to_en(text):
+    return "yes" if "כן" in (text or "") else ("no" if "לא" in (text or "") else "hello")
+
+
+# Canned OpenAI chat completions, consumed in order by the mocked client.
+# Entries are response objects or exceptions to raise.
+_llm_responses: list = []
+
+
+def _llm_response(content=None, function_call=None):
+    fc = None
+    if function_call is not None:
+        name, arguments = function_call
+        fc = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content, function_call=fc))])
+
+
+_DEFAULT_LLM_RESPONSE = _llm_response(content="Thanks. How do you handle inbound leads today?")
+
+
+def _canned_llm_completion(**kwargs):
+    response = _llm_responses.pop(0) if _llm_responses else _DEFAULT_LLM_RESPONSE
+    if isinstance(response, BaseException):
+        raise response
+    return response
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "real_llm: keep the real app.llm_agent functions (tests mock the OpenAI client instead)",
+    )
 
-    # Offline deterministic LLM behavior for endpoint/integration tests.
-    # IMPORTANT: do not patch `app.llm_agent` for `tests/test_llm_agent.py`, which
-    # unit-tests the real implementation by mocking the OpenAI client.
-    if "tests/test_llm_agent.py" not in request.node.nodeid:
-        from app import llm_agent as llm_agent_module
-
-        def _fake_get_initial_greeting(lead):
-            name = None
-            try:
-                name = (lead.name.split()[0] if lead and getattr(lead, "name", None) else None)
-            except Exception:
-                name = None
-            who = name or "there"
-            return (
-                f"Hi {who}! I'm the agent from Habari's Sales Company. We help companies increase sales with AI agents. "
-                "Is this a good time to talk? Please answer ONLY yes or no."
-            )
-
-        def _fake_decide_next_turn_llm(*, lead, history, last_user_utterance):
-            text = (last_user_utterance or "").strip().lower()
-            if "who are you" in text:
-                return (
-                    "I'm Messiah, an AI agent from Habari's Sales Company. We help sales teams increase sales with AI agents.",
-                    None,
-                    None,
-                )
-            if "not interested" in text or text in {"no", "nope"}:
-                return (
-                    "No problem. If you change your mind, feel free to reach out. Goodbye.",
-                    "end_call",
-                    {"reason": "Not interested"},
-                )
-            if "yes" in text or "sounds interesting" in text:
-                return (
-                    "Great. I can offer a quick intro call. Does tomorrow 10:00 or Thursday 14:00 work?",
-                    "offer_slots",
-                    {
-                        "slots": [
-                            {"start": "2030-01-01T10:00:00", "display_text": "tomorrow 10:00", "duration_minutes": 30},
-                            {"start": "2030-01-03T14:00:00", "display_text": "Thursday 14:00", "duration_minutes": 30},
-                        ]
-                    },
-                )
-            return ("Thanks. How do you handle inbound leads today?", None, None)
 
+@pytest.fixture(scope="session")
+def app():
+    """The FastAPI app, imported on first use.
+
+    Collecting or running tests that never need it does not pay for the
+    full app import graph.
+    """
+    from app.main import app as fastapi_app
+
+    return fastapi_app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """One TestClient per session (per xdist worker).
+
+    Entering it as a context manager runs the app lifespan once and keeps the
+    same ASGI portal for every request instead of starting one per call.
+    """
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _mock_openai():
+    """Replace the OpenAI client once for the whole session; no test reaches the network."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = _canned_llm_completion
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(llm_agent_module, "client", mock_client)
+        yield mock_client
+
+
+@pytest.fixture
+def set_llm_response(_mock_openai):
+    """Queue the next OpenAI response(s) for code that calls app.llm_agent.client.
+
+    Usage: set_llm_response(content="..."), set_llm_response(function_call=("end_call", '{"reason": "x"}'))
+    or set_llm_response(error=Exception("API Error")). Unqueued calls get a plain default reply.
+    """
+    _llm_responses.clear()
+    _mock_openai.chat.completions.create.reset_mock()
+
+    def _set(content=None, function_call=None, error=None):
+        _llm_responses.append(error if error is not None else _llm_response(content, function_call))
+
+    yield _set
+    _llm_responses.clear()
+
+
+@pytest.fixture(autouse=True)
+def _block_network(monkeypatch):
+    """Make every un-mocked external call raise instead of hitting the network."""
+    for module, name in _NETWORK_ENTRYPOINTS:
+        monkeypatch.setattr(module, name, _network_blocker(f"{module.__name__}.{name}"))
+
+
+@pytest.fixture(autouse=True)
+def _pristine_stores():
+    """Reset the lead and meeting stores in place to their import-time contents."""
+    leads_store._leads_db.clear()
+    leads_store._leads_db.update(copy.deepcopy(_PRISTINE_LEADS))
+    leads_store._next_lead_id = _PRISTINE_NEXT_LEAD_ID
+    calendar_store._meetings_db.clear()
+    calendar_store._meetings_db.update(copy.deepcopy(_PRISTINE_MEETINGS))
+    calendar_store._next_meeting_id = _PRISTINE_NEXT_MEETING_ID
+
+
+@pytest.fixture(scope="session")
+def _debug_calls_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("debug_calls"))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_sessions(monkeypatch, _debug_calls_dir):
+    """Give each test an empty in-memory session store.
+
+    Debug-event files go to a per-session temp dir instead of ./debug_calls.
+    """
+    monkeypatch.setattr(redis_client_module, "_INMEM_SESSIONS", {})
+    monkeypatch.setattr(redis_client_module, "_debug_dir", lambda: _debug_calls_dir)
+
+
+@pytest.fixture(autouse=True)
+def _safe_test_config(monkeypatch, request):
+    """Force deterministic, offline-safe config for tests.
+
+    The repo loads .env on import; these overrides prevent real network calls
+    (OpenAI/Twilio) and reduce test flakiness.
+    """
+    # Patch the instance too, to keep it in sync for any code that reads
+    # instance attributes directly.
+    for target in (Config, app_config):
+        for name, value in _SAFE_CONFIG.items():
+            monkeypatch.setattr(target, name, value, raising=False)
+
+    # Offline deterministic LLM behavior for endpoint/integration tests.
+    # IMPORTANT: tests marked `real_llm` (tests/test_llm_agent.py) unit-test the
+    # real implementation by mocking the OpenAI client, so leave them alone.
+    if request.node.get_closest_marker("real_llm") is None:
         monkeypatch.setattr(llm_agent_module, "get_initial_greeting", _fake_get_initial_greeting, raising=True)
         monkeypatch.setattr(llm_agent_module, "decide_next_turn_llm", _fake_decide_next_turn_llm, raising=True)
 
     # Offline deterministic translation.
-    from app.language import translator as translator_module
-    from app.language.caller_he import get_caller_text
-
-    monkeypatch.setattr(
-        translator_module,
-        "translate_en_to_he",
-        lambda _: get_caller_text("permission_ask"),
-        raising=True,
-    )
-    monkeypatch.setattr(
-        translator_module,
-        "translate_he_to_en",
-        lambda t: "yes" if "כן" in (t or "") else ("no" if "לא" in (t or "") else "hello"),
-        raising=True,
-    )
+    monkeypatch.setattr(translator_module, "translate_en_to_he", _fake_translate_en_to_he, raising=True)
+    monkeypatch.setattr(translator_module, "translate_he_to_en", _fake_translate_he_to_en, raising=True)
 
-    return config
+    return app_config
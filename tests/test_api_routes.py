@@ -1,13 +1,9 @@
 """Tests for API routes."""
 
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
 
-client = TestClient(app)
 
-
-def test_root_endpoint():
+def test_root_endpoint(client):
     """Test root endpoint returns API info."""
     response = client.get("/")
     assert response.status_code == 200
@@ -17,7 +13,7 @@ def test_root_endpoint():
     assert "endpoints" in data
 
 
-def test_agent_turn_basic_request():
+def test_agent_turn_basic_request(client):
     """Test /agent/turn endpoint with basic request."""
     response = client.post(
         "/agent/turn",
@@ -40,7 +36,7 @@ def test_agent_turn_basic_request():
     assert "action_payload" in data
 
 
-def test_agent_turn_who_are_you():
+def test_agent_turn_who_are_you(client):
     """Test agent responds to 'who are you' question."""
     response = client.post(
         "/agent/turn",
@@ -59,7 +55,7 @@ def test_agent_turn_who_are_you():
     assert data["action"] is None
 
 
-def test_agent_turn_not_interested():
+def test_agent_turn_not_interested(client):
     """Test agent handles 'not interested' correctly."""
     response = client.post(
         "/agent/turn",
@@ -79,7 +75,7 @@ def test_agent_turn_not_interested():
     assert data["action"] == "end_call"
 
 
-def test_agent_turn_without_lead():
+def test_agent_turn_without_lead(client):
     """Test /agent/turn works without lead_id."""
     response = client.post(
         "/agent/turn",
@@ -94,7 +90,7 @@ def test_agent_turn_without_lead():
     assert "agent_reply" in data
 
 
-def test_agent_turn_invalid_lead():
+def test_agent_turn_invalid_lead(client):
     """Test /agent/turn with invalid lead_id."""
     response = client.post(
         "/agent/turn",
@@ -108,7 +104,7 @@ def test_agent_turn_invalid_lead():
     assert response.status_code == 404
 
 
-def test_list_meetings_endpoint():
+def test_list_meetings_endpoint(client):
     """Test /meetings endpoint."""
     response = client.get("/meetings")
     
@@ -119,7 +115,7 @@ def test_list_meetings_endpoint():
     assert isinstance(data, list)
 
 
-def test_list_leads_endpoint():
+def test_list_leads_endpoint(client):
     """Test /leads endpoint."""
     response = client.get("/leads")
     
@@ -131,24 +127,7 @@ def test_list_leads_endpoint():
     assert len(data) >= 1  # We initialize with sample leads
 
 
-def test_twilio_voice_endpoint():
-    """Test /twilio/voice endpoint returns TwiML."""
-    response = client.post("/twilio/voice")
-    
-    assert response.status_code == 200
-    
-    # Should return XML
-    assert "xml" in response.headers.get("content-type", "").lower()
-    
-    # Check for TwiML structure
-    content = response.text
-    assert "<Response>" in content
-    assert "<Say" in content
-    assert "he-IL" in content  # Hebrew language
-    assert "<Record" in content
-
-
-def test_agent_turn_positive_flow():
+def test_agent_turn_positive_flow(client):
     """Test a positive conversation flow leading to slot offer."""
     # Initial greeting
     response1 = client.post(
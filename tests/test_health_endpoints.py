@@ -1,19 +1,11 @@
-from fastapi.testclient import TestClient
-
-from app.main import app
-
-
-client = TestClient(app)
-
-
-def test_health_check():
+def test_health_check(client):
     resp = client.get("/health")
     assert resp.status_code == 200
     data = resp.json()
     assert data["status"] == "healthy"
 
 
-def test_health_ready():
+def test_health_ready(client):
     resp = client.get("/health/ready")
     # health/ready returns (checks, status_code)
     assert resp.status_code == 200
@@ -26,7 +18,7 @@ def test_health_ready():
     assert checks["ready"] is True
 
 
-def test_health_info():
+def test_health_info(client):
     resp = client.get("/health/info")
     assert resp.status_code == 200
     data = resp.json()
@@ -1,15 +1,7 @@
-from unittest.mock import Mock
-
 import pytest
-from fastapi.testclient import TestClient
-
-from app.main import app
-
-
-client = TestClient(app)
 
 
-def test_twilio_process_recording_hangup_on_end_call(monkeypatch):
+def test_twilio_process_recording_hangup_on_end_call(client, monkeypatch):
     """Recording webhook should return hangup TwiML when agent ends call."""
     # Make transcription deterministic and offline.
     # Returning a not-interested phrase triggers the fast-path hangup.
@@ -35,12 +27,12 @@ def test_twilio_process_recording_hangup_on_end_call(monkeypatch):
     assert "<Hangup" in resp.text
 
 
-def test_twilio_debug_disabled_by_default():
+def test_twilio_debug_disabled_by_default(client):
     resp = client.get("/twilio/debug/CA_TEST")
     assert resp.status_code in (404, 403)
 
 
-def test_twilio_debug_enabled(monkeypatch):
+def test_twilio_debug_enabled(client, monkeypatch):
     from app.config import config
 
     monkeypatch.setattr(config, "DEBUG_CALL_EVENTS", True, raising=False)
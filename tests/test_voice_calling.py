@@ -1,107 +1,168 @@
 """Tests for voice calling functionality."""
 
-from fastapi.testclient import TestClient
-from app.main import app
+import asyncio
 
-client = TestClient(app)
+import pytest
 
+from app import leads_store
+from app.language.caller_he import get_caller_text
+from app.redis_client import SessionManager
 
-def test_twilio_voice_endpoint_returns_twiml():
-    """Test /twilio/voice endpoint returns proper TwiML."""
-    response = client.post(
-        "/twilio/voice",
-        data={
-            "CallSid": "CA1234567890",
-            "From": "+972501234567",
-            "To": "+972501111111"
-        }
-    )
-    
-    assert response.status_code == 200
+
+# Markers every greeting TwiML must contain.
+_GREETING_TWIML_MARKERS = ("<Response>", "<Say", "he-IL", "<Record", 'playBeep="false"')
+
+
+def assert_twiml_contains(content, *markers):
+    """Assert `content` contains every marker, listing all the missing ones on failure."""
+    missing = [m for m in markers if m not in content]
+    assert not missing, f"missing from TwiML: {missing}"
+
+
+def assert_ok_twiml(response):
+    """Assert a 200 XML TwiML response and return its body text."""
+    assert response.status_code == 200, response.text
     assert "application/xml" in response.headers.get("content-type", "")
-    
-    content = response.text
-    assert "<Response>" in content
-    assert "<Say" in content
-    assert "he-IL" in content
-    assert "<Record" in content
-    assert "playBeep=\"false\"" in content
+    return response.text
 
 
-def test_twilio_voice_recognizes_lead():
-    """Test that voice endpoint recognizes lead by phone number."""
-    response = client.post(
-        "/twilio/voice",
-        data={
-            "CallSid": "CA1234567890",
-            "From": "+972501234567",  # This matches our sample lead
-            "To": "+972501111111"
-        }
+LEAD_PHONE = "+972501234567"
+
+
+@pytest.fixture
+def caller_lead():
+    """A lead reachable at LEAD_PHONE (_pristine_stores resets the store before each test)."""
+    return leads_store.create_lead(
+        name="Test Lead",
+        company="Test Co",
+        role="CEO",
+        phone=LEAD_PHONE,
     )
+
+
+@pytest.mark.parametrize(
+    "form,recognized",
+    [
+        ({}, False),  # bare webhook, no caller details
+        ({"CallSid": "CA1", "From": LEAD_PHONE, "To": "+972501111111"}, True),  # inbound from the lead
+        ({"CallSid": "CA2", "From": "+972501111111", "To": LEAD_PHONE}, True),  # outbound to the lead
+        ({"CallSid": "CA3", "From": "+972509999999", "To": "+972501111111"}, False),  # unknown caller
+    ],
+    ids=["empty_form", "inbound_lead", "outbound_lead", "unknown_caller"],
+)
+def test_twilio_voice_twiml(client, caller_lead, form, recognized):
+    """Test /twilio/voice returns the Hebrew greeting + Record TwiML and recognizes leads by phone."""
+    content = assert_ok_twiml(client.post("/twilio/voice", data=form))
     
-    assert response.status_code == 200
-    content = response.text
-    # Ensure TwiML shape is correct (lead personalization depends on translation/LLM settings).
-    assert "<Response>" in content
-    assert "<Say" in content
-    assert "<Record" in content
+    assert_twiml_contains(content, *_GREETING_TWIML_MARKERS)
+    if form:
+        session = SessionManager.get_session(form["CallSid"])
+        assert session["lead_id"] == (caller_lead.id if recognized else 0)
 
 
-def test_twilio_process_speech_handles_input():
-    """Test /twilio/process-speech handles speech input."""
-    response = client.post(
-        "/twilio/process-speech",
-        data={
-            "CallSid": "CA1234567890",
-            "SpeechResult": "שלום",
-            "Confidence": "0.95"
+CALL_SID = "CA1234567890"
+
+
+@pytest.fixture
+def primed_call(request):
+    """Seed an in-progress call session for CALL_SID.
+
+    Past the permission gate by default; parametrize indirectly with
+    "permission" to seed a call still waiting for the yes/no answer.
+    """
+    SessionManager.save_session(
+        CALL_SID,
+        {
+            "lead_id": 1,
+            "conversation_history": [],
+            "conversation_history_he": [],
+            "idempotency": {},
+            "debug_events": [],
+            "call_stage": getattr(request, "param", "conversation"),
         },
-        params={"call_sid": "CA1234567890", "lead_id": 1, "turn": 0}
     )
-    
-    assert response.status_code == 200
-    assert "application/xml" in response.headers.get("content-type", "")
-    
-    content = response.text
-    assert "<Response>" in content
-    assert "<Say" in content
+    return CALL_SID
 
 
-def test_twilio_process_speech_handles_not_interested():
-    """Test that 'not interested' triggers hangup."""
-    response = client.post(
-        "/twilio/process-speech",
-        data={
-            "CallSid": "CA1234567890",
-            "SpeechResult": "לא מעוניין",
-            "Confidence": "0.95"
-        },
-        params={"call_sid": "CA1234567890", "lead_id": 1, "turn": 0}
+def _process_speech(call_sid, speech, confidence, turn=0):
+    """Run one Gather turn through the /twilio/process-speech handler body, skipping ASGI.
+
+    Returns the TwiML response body decoded as str.
+    """
+    # Imported here so collecting this file does not pull in the router and FastAPI.
+    from app.routers.twilio import _process_hebrew_turn
+
+    response = asyncio.run(
+        _process_hebrew_turn(
+            call_sid=call_sid,
+            lead_id=1,
+            turn=turn,
+            speech_he=speech,
+            confidence=confidence,
+            raw={"CallSid": call_sid, "SpeechResult": speech, "Confidence": confidence},
+            source="gather",
+            source_id="",
+            allow_record_fallback=True,
+        )
     )
-    
-    assert response.status_code == 200
-    content = response.text
-    assert "<Hangup" in content
+    return response.body.decode("utf-8")
 
 
-def test_twilio_process_speech_handles_no_speech():
-    """Test handling when no speech is detected."""
-    response = client.post(
-        "/twilio/process-speech",
-        data={
-            "CallSid": "CA1234567890",
-            "SpeechResult": "",  # No speech
-            "Confidence": "0.0"
-        },
-        params={"call_sid": "CA1234567890", "lead_id": 1, "turn": 0}
+def test_twilio_process_speech_endpoint(client, primed_call):
+    """Smoke test: /twilio/process-speech routes form + query params and returns TwiML."""
+    content = assert_ok_twiml(
+        client.post(
+            "/twilio/process-speech",
+            data={
+                "CallSid": primed_call,
+                "SpeechResult": "שלום",
+                "Confidence": "0.95",
+            },
+            params={"call_sid": primed_call, "lead_id": 1, "turn": 0}
+        )
     )
     
-    assert response.status_code == 200
-    content = response.text
-    assert "<Hangup" in content
+    assert "<Response>" in content
+
+
+@pytest.mark.parametrize(
+    "speech,confidence,expected,hangup",
+    [
+        ("שלום", "0.95", "<Say", False),  # regular input continues the conversation
+        ("לא מעוניין", "0.95", get_caller_text("not_interested_goodbye"), True),  # says goodbye, hangs up
+        ("", "0.0", get_caller_text("no_response_retry"), True),  # no speech detected
+    ],
+    ids=["handles_input", "handles_not_interested", "handles_no_speech"],
+)
+def test_twilio_process_speech(primed_call, speech, confidence, expected, hangup):
+    """Test speech processing for regular, not-interested and empty speech."""
+    content = _process_speech(primed_call, speech, confidence)
 
+    assert_twiml_contains(content, "<Response>", expected)
+    assert ("<Hangup" in content) is hangup
 
-def test_initiate_outbound_call_without_twilio():
+
+@pytest.mark.parametrize("primed_call", ["permission"], indirect=True)
+@pytest.mark.parametrize(
+    "speech,expected,hangup,stage_after",
+    [
+        ("שלום", get_caller_text("permission_clarify"), False, "permission"),  # neither yes nor no: ask again
+        ("לא", get_caller_text("not_interested_goodbye"), True, None),  # no: goodbye, session dropped
+        ("כן", "<Say", False, "conversation"),  # yes: gate opens, the agent takes the turn
+    ],
+    ids=["clarifies", "declines", "accepts"],
+)
+def test_twilio_process_speech_permission_gate(primed_call, speech, expected, hangup, stage_after):
+    """Test the yes/no permission gate on the first caller answer."""
+    content = _process_speech(primed_call, speech, "0.95")
+
+    assert_twiml_contains(content, "<Response>", expected)
+    assert ("<Hangup" in content) is hangup
+    session = SessionManager.get_session(primed_call)
+    assert (session or {}).get("call_stage") == stage_after
+
+
+def test_initiate_outbound_call_without_twilio(client):
     """Test outbound call initiation without Twilio config."""
     response = client.post("/outbound/initiate-call?lead_id=1")
     
@@ -114,14 +175,14 @@ def test_initiate_outbound_call_without_twilio():
     assert "lead" in data
 
 
-def test_initiate_outbound_call_invalid_lead():
+def test_initiate_outbound_call_invalid_lead(client):
     """Test outbound call with invalid lead ID."""
     response = client.post("/outbound/initiate-call?lead_id=99999")
     
     assert response.status_code == 404
 
 
-def test_initiate_campaign_without_twilio():
+def test_initiate_campaign_without_twilio(client):
     """Test campaign initiation without Twilio config."""
     response = client.post("/outbound/campaign")
     
@@ -133,7 +194,7 @@ def test_initiate_campaign_without_twilio():
     assert "leads_count" in data
 
 
-def test_call_status_webhook():
+def test_call_status_webhook(client):
     """Test call status webhook receives updates."""
     response = client.post(
         "/twilio/call-status",
@@ -148,7 +209,16 @@ def test_call_status_webhook():
     assert data["status"] == "received"
 
 
-def test_twilio_process_speech_offers_slots():
+# A conversation that has passed the permission gate.
+QUALIFYING_HISTORY = [
+    {"role": "assistant", "content": "Is this a good time to talk? Please answer ONLY yes or no."},
+    {"role": "user", "content": "yes"},
+    {"role": "assistant", "content": "Great. How do you handle inbound leads today?"},
+    {"role": "user", "content": "We call them back manually."},
+]
+
+
+def test_twilio_process_speech_offers_slots(client):
     """Test that a positive response leads to slot offering.
 
     In LLM-only mode, we validate this through /agent/turn (LLM is mocked in conftest).
@@ -159,7 +229,7 @@ def test_twilio_process_speech_offers_slots():
         json={
             "lead_id": 1,
             "user_utterance": "Yes, sounds interesting",
-            "history": [{"user": "Hello", "agent": "Hi!"}],
+            "history": QUALIFYING_HISTORY,
         },
     )
     assert resp.status_code == 200
@@ -169,47 +239,52 @@ def test_twilio_process_speech_offers_slots():
     assert "slots" in data["action_payload"]
 
 
+def test_twilio_process_speech_renders_slot_offer(primed_call):
+    """A "yes" in conversation makes the agent offer slots: ask_time is said and the slots are kept."""
+    content = _process_speech(primed_call, "כן", "0.95")
+
+    assert_twiml_contains(content, "<Response>", get_caller_text("ask_time"), "<Record")
+    assert "<Hangup" not in content
+    session = SessionManager.get_session(primed_call)
+    assert session["last_action"] == "offer_slots"
+    assert session["pending_slots"] == session["last_action_payload"]["slots"]
+    assert session["pending_slots"]
+
+
 def test_twilio_does_not_offer_slots_twice_when_pending_slots_exist():
     """If slots were already offered, a follow-up ambiguous "yes" shouldn't re-offer them."""
 
     call_sid = "CA9999999999"
-    client.post(
-        "/twilio/voice",
-        data={
-            "CallSid": call_sid,
-            "From": "+972501234567",
-            "To": "+972501111111",
-        },
-    )
-
-    # Turn 0: permission yes -> mocked LLM offers slots.
-    r1 = client.post(
-        "/twilio/process-speech",
-        data={
-            "CallSid": call_sid,
-            "SpeechResult": "כן",
-            "Confidence": "0.95",
+    # Seed the state after turn 0 directly: permission granted and slots already offered.
+    offered_slots = [
+        {"start": "2030-01-01T10:00:00", "display_text": "tomorrow 10:00", "duration_minutes": 30},
+        {"start": "2030-01-03T14:00:00", "display_text": "Thursday 14:00", "duration_minutes": 30},
+    ]
+    SessionManager.save_session(
+        call_sid,
+        {
+            "lead_id": 1,
+            "conversation_history": [
+                {"role": "assistant", "content": "Is this a good time to talk?"},
+                {"role": "user", "content": "yes"},
+                {"role": "assistant", "content": "Does tomorrow 10:00 or Thursday 14:00 work?"},
+            ],
+            "conversation_history_he": [],
+            "idempotency": {},
+            "debug_events": [],
+            "call_stage": "conversation",
+            "last_action": "offer_slots",
+            "last_action_payload": {"slots": offered_slots},
+            "pending_slots": offered_slots,
         },
-        params={"call_sid": call_sid, "lead_id": 1, "turn": 0},
     )
-    assert r1.status_code == 200
-    assert "איזה זמן מתאים לך?" in r1.text  # offer_slots TwiML includes ask_time prompt
 
     # Turn 1: ambiguous yes again. Without a guard, the mocked LLM would offer slots again.
-    r2 = client.post(
-        "/twilio/process-speech",
-        data={
-            "CallSid": call_sid,
-            "SpeechResult": "כן",
-            "Confidence": "0.95",
-        },
-        params={"call_sid": call_sid, "lead_id": 1, "turn": 1},
-    )
-    assert r2.status_code == 200
-    assert "איזה זמן מתאים לך?" not in r2.text  # continue TwiML should not repeat the slot-offer prompt
+    content = _process_speech(call_sid, "כן", "0.95", turn=1)
+    assert "איזה זמן מתאים לך?" not in content  # continue TwiML should not repeat the slot-offer prompt
 
 
-def test_root_endpoint_includes_outbound():
+def test_root_endpoint_includes_outbound(client):
     """Test that root endpoint lists outbound endpoints."""
     response = client.get("/")
     